@@ -1,11 +1,13 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import os
 import sys
+import tempfile
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QTableWidget, QTableWidgetItem,
                              QVBoxLayout, QWidget, QPushButton, QHBoxLayout, QLabel,
-                             QComboBox, QHeaderView, QMessageBox)
-from PyQt6.QtCore import Qt, QSize
+                             QComboBox, QHeaderView, QMessageBox, QFileDialog)
+from PyQt6.QtCore import Qt, QSize, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QColor
 
 
@@ -39,6 +41,111 @@ def download_and_add_employees():
     return df
 
 
+class ExportWorker(QThread):
+    # Write a DataFrame to CSV/Parquet/XLSX in row slices so memory stays flat
+    progress = pyqtSignal(int, int)
+    completed = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    CHUNK_SIZE = 50000
+    EXCEL_MAX_ROWS = 1048576
+
+    def __init__(self, df, path, index=False, parent=None):
+        super().__init__(parent)
+        self.df = df
+        self.path = path
+        self.index = index
+        self.temp_path = None
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def iter_chunks(self):
+        # iloc slices are views of the frame, no full copy is built
+        for start in range(0, len(self.df), self.CHUNK_SIZE):
+            if self._cancel_requested:
+                return
+            yield start, self.df.iloc[start:start + self.CHUNK_SIZE]
+
+    def run(self):
+        extension = os.path.splitext(self.path)[1].lower()
+        try:
+            # Write next to the target and only replace it once the export succeeded,
+            # so a cancelled or failed export never touches an existing file
+            fd, self.temp_path = tempfile.mkstemp(suffix=extension, prefix='.export-',
+                                                  dir=os.path.dirname(os.path.abspath(self.path)))
+            os.close(fd)
+            if extension == '.parquet':
+                self.write_parquet()
+            elif extension == '.xlsx':
+                self.write_excel()
+            else:
+                self.write_csv()
+        except Exception as e:
+            self.remove_temp_file()
+            self.failed.emit(str(e))
+            return
+
+        if self._cancel_requested:
+            self.remove_temp_file()
+            self.cancelled.emit()
+            return
+
+        try:
+            os.replace(self.temp_path, self.path)
+        except OSError as e:
+            self.remove_temp_file()
+            self.failed.emit(str(e))
+            return
+        self.completed.emit(self.path)
+
+    def write_csv(self):
+        total = len(self.df)
+        with open(self.temp_path, 'w', newline='', encoding='utf-8') as f:
+            self.df.iloc[:0].to_csv(f, index=self.index)
+            for start, chunk in self.iter_chunks():
+                chunk.to_csv(f, header=False, index=self.index)
+                self.progress.emit(start + len(chunk), total)
+
+    def write_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        total = len(self.df)
+        schema = pa.Schema.from_pandas(self.df.iloc[:self.CHUNK_SIZE], preserve_index=self.index)
+        with pq.ParquetWriter(self.temp_path, schema) as writer:
+            for start, chunk in self.iter_chunks():
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=self.index))
+                self.progress.emit(start + len(chunk), total)
+
+    def write_excel(self):
+        from openpyxl import Workbook
+
+        total = len(self.df)
+        if total + 1 > self.EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel supports at most {self.EXCEL_MAX_ROWS - 1} rows, got {total}")
+
+        # write_only mode streams rows to disk instead of keeping cells in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        header = [str(col) for col in self.df.columns]
+        if self.index:
+            header.insert(0, str(self.df.index.name or ''))
+        sheet.append(header)
+        for start, chunk in self.iter_chunks():
+            for row in chunk.itertuples(index=self.index, name=None):
+                sheet.append([None if pd.isna(value) else value for value in row])
+            self.progress.emit(start + len(chunk), total)
+        # Saving also closes the write-only stream; on cancel the temp file is dropped
+        workbook.save(self.temp_path)
+
+    def remove_temp_file(self):
+        if self.temp_path is not None and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
 class EmployeeTableWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -47,6 +154,7 @@ class EmployeeTableWindow(QMainWindow):
 
         self.df = download_and_add_employees()
         self.filtered_df = self.df.copy()
+        self.export_worker = None
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -97,6 +205,16 @@ class EmployeeTableWindow(QMainWindow):
         button_layout.addWidget(self.tester_btn)
         button_layout.addWidget(self.count_btn)
 
+        self.export_btn = QPushButton("Xuất dữ liệu")
+        self.export_btn.clicked.connect(self.export_filtered)
+
+        self.cancel_export_btn = QPushButton("Hủy xuất")
+        self.cancel_export_btn.setEnabled(False)
+        self.cancel_export_btn.clicked.connect(self.cancel_export)
+
+        button_layout.addWidget(self.export_btn)
+        button_layout.addWidget(self.cancel_export_btn)
+
         self.table = QTableWidget()
         self.table.setFont(QFont("Arial", 10))
 
@@ -107,6 +225,7 @@ class EmployeeTableWindow(QMainWindow):
         self.show_all_employees()
 
     def populate_table(self, df, headers=None):
+        self.filtered_df = df
         self.table.clear()
         self.table.setRowCount(len(df))
         self.table.setColumnCount(len(df.columns))
@@ -151,7 +270,6 @@ class EmployeeTableWindow(QMainWindow):
             except ValueError:
                 print(f"Invalid year: {selected_year}")
 
-        self.filtered_df = filtered_df
         self.populate_table(filtered_df)
 
         print(f"Total rows after filtering: {len(filtered_df)}")
@@ -184,6 +302,7 @@ class EmployeeTableWindow(QMainWindow):
     def show_role_counts(self):
         role_counts = self.df['Role'].value_counts().reset_index()
         role_counts.columns = ['Vai trò', 'Số lượng']
+        self.filtered_df = role_counts
 
         self.table.clear()
         self.table.setRowCount(len(role_counts))
@@ -210,6 +329,61 @@ class EmployeeTableWindow(QMainWindow):
         self.role_combo.setCurrentText("Tất cả")
         self.year_combo.setCurrentText("Tất cả")
 
+    def export_filtered(self):
+        if self.export_worker is not None and self.export_worker.isRunning():
+            self.show_error_message("Đang xuất dữ liệu, vui lòng chờ hoặc hủy.")
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Xuất dữ liệu", "employees.csv",
+            "CSV (*.csv);;Parquet (*.parquet);;Excel (*.xlsx)")
+        if not path:
+            return
+
+        self.export_worker = ExportWorker(self.filtered_df, path, parent=self)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.completed.connect(self.on_export_completed)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.cancelled.connect(self.on_export_cancelled)
+
+        self.export_btn.setEnabled(False)
+        self.cancel_export_btn.setEnabled(True)
+        self.statusBar().showMessage(f"Đang xuất {len(self.filtered_df)} dòng...")
+        self.export_worker.start()
+
+    def cancel_export(self):
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.statusBar().showMessage("Đang hủy xuất dữ liệu...")
+
+    def on_export_progress(self, written, total):
+        percent = written * 100 // total if total else 100
+        self.statusBar().showMessage(f"Đã xuất {written}/{total} dòng ({percent}%)")
+
+    def on_export_completed(self, path):
+        self.finish_export()
+        self.statusBar().showMessage(f"Đã xuất dữ liệu ra {path}", 5000)
+
+    def on_export_failed(self, message):
+        self.finish_export()
+        self.statusBar().clearMessage()
+        self.show_error_message(f"Lỗi xuất dữ liệu: {message}")
+
+    def on_export_cancelled(self):
+        self.finish_export()
+        self.statusBar().showMessage("Đã hủy xuất dữ liệu", 5000)
+
+    def finish_export(self):
+        self.export_btn.setEnabled(True)
+        self.cancel_export_btn.setEnabled(False)
+
+    def closeEvent(self, event):
+        # A running QThread must finish before the window that owns it is destroyed
+        if self.export_worker is not None and self.export_worker.isRunning():
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        super().closeEvent(event)
+
     def show_error_message(self, message):
         error_box = QMessageBox()
         error_box.setIcon(QMessageBox.Icon.Warning)
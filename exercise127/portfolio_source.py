@@ -0,0 +1,72 @@
+import glob
+import os
+
+import pandas as pd
+
+PORTFOLIO_COLUMNS = ['Symbol', 'Price', 'PE', 'Group', 'USD', 'Source']
+
+
+def read_portfolio_file(path):
+    # Parse one SampleData2.csv-style file and tag every row with its file name
+    df = pd.read_csv(path)
+    df['USD'] = df['Price'] / 23
+    df['Source'] = os.path.basename(path)
+    return df[PORTFOLIO_COLUMNS]
+
+
+class PortfolioSource:
+    # Polls a directory of portfolio CSV files by mtime and size.
+    # poll() only re-parses files whose signature changed since the last poll.
+    def __init__(self, directory, pattern='*.csv'):
+        self.directory = directory
+        self.pattern = pattern
+        self.signatures = {}
+        # Files whose current version could not be parsed, with the error message
+        self.failed = {}
+
+    def _scan(self):
+        signatures = {}
+        for path in glob.glob(os.path.join(self.directory, self.pattern)):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Deleted between glob and stat, the next poll will report it
+                continue
+            signatures[os.path.basename(path)] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def load_all(self):
+        # Initial load of every file into one frame
+        self.signatures = {}
+        self.failed = {}
+        changed, _, _ = self.poll()
+        frames = [df for _, df in sorted(changed.items())]
+        if not frames:
+            return pd.DataFrame(columns=PORTFOLIO_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def poll(self):
+        # Returns ({source: new rows} for new or changed files, [sources of removed files],
+        # {source: error} for files that failed to parse in this poll)
+        current = self._scan()
+        changed = {}
+        errors = {}
+        for source, signature in current.items():
+            if self.signatures.get(source) == signature:
+                continue
+            # Record the signature even on failure, so a bad file is only
+            # retried once it changes again (e.g. after it finished writing)
+            self.signatures[source] = signature
+            try:
+                changed[source] = read_portfolio_file(os.path.join(self.directory, source))
+            except Exception as e:
+                errors[source] = str(e)
+                self.failed[source] = str(e)
+                continue
+            self.failed.pop(source, None)
+
+        removed = [source for source in self.signatures if source not in current]
+        for source in removed:
+            del self.signatures[source]
+            self.failed.pop(source, None)
+        return changed, removed, errors
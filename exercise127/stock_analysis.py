@@ -1,14 +1,126 @@
 import pandas as pd
+import os
 import sys
+import tempfile
 
 import matplotlib.pyplot as plt
 from PyQt6 import uic
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt6.QtGui import QColor
-from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QLabel, QFrame, QTableWidgetItem, QMessageBox, QApplication
+from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QLabel, QFrame, QTableWidgetItem, QMessageBox, QApplication, \
+    QFileDialog
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import numpy as np
 
+from portfolio_source import PortfolioSource
+from stock_sketches import StockSketches
+from stock_store import VersionedFrame
+
+
+class ExportWorker(QThread):
+    # Write a DataFrame to CSV/Parquet/XLSX in row slices so memory stays flat
+    progress = pyqtSignal(int, int)
+    completed = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    CHUNK_SIZE = 50000
+    EXCEL_MAX_ROWS = 1048576
+
+    def __init__(self, df, path, index=False, parent=None):
+        super().__init__(parent)
+        self.df = df
+        self.path = path
+        self.index = index
+        self.temp_path = None
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def iter_chunks(self):
+        # iloc slices are views of the frame, no full copy is built
+        for start in range(0, len(self.df), self.CHUNK_SIZE):
+            if self._cancel_requested:
+                return
+            yield start, self.df.iloc[start:start + self.CHUNK_SIZE]
+
+    def run(self):
+        extension = os.path.splitext(self.path)[1].lower()
+        try:
+            # Write next to the target and only replace it once the export succeeded,
+            # so a cancelled or failed export never touches an existing file
+            fd, self.temp_path = tempfile.mkstemp(suffix=extension, prefix='.export-',
+                                                  dir=os.path.dirname(os.path.abspath(self.path)))
+            os.close(fd)
+            if extension == '.parquet':
+                self.write_parquet()
+            elif extension == '.xlsx':
+                self.write_excel()
+            else:
+                self.write_csv()
+        except Exception as e:
+            self.remove_temp_file()
+            self.failed.emit(str(e))
+            return
+
+        if self._cancel_requested:
+            self.remove_temp_file()
+            self.cancelled.emit()
+            return
+
+        try:
+            os.replace(self.temp_path, self.path)
+        except OSError as e:
+            self.remove_temp_file()
+            self.failed.emit(str(e))
+            return
+        self.completed.emit(self.path)
+
+    def write_csv(self):
+        total = len(self.df)
+        with open(self.temp_path, 'w', newline='', encoding='utf-8') as f:
+            self.df.iloc[:0].to_csv(f, index=self.index)
+            for start, chunk in self.iter_chunks():
+                chunk.to_csv(f, header=False, index=self.index)
+                self.progress.emit(start + len(chunk), total)
+
+    def write_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        total = len(self.df)
+        schema = pa.Schema.from_pandas(self.df.iloc[:self.CHUNK_SIZE], preserve_index=self.index)
+        with pq.ParquetWriter(self.temp_path, schema) as writer:
+            for start, chunk in self.iter_chunks():
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=self.index))
+                self.progress.emit(start + len(chunk), total)
+
+    def write_excel(self):
+        from openpyxl import Workbook
+
+        total = len(self.df)
+        if total + 1 > self.EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel supports at most {self.EXCEL_MAX_ROWS - 1} rows, got {total}")
+
+        # write_only mode streams rows to disk instead of keeping cells in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        header = [str(col) for col in self.df.columns]
+        if self.index:
+            header.insert(0, str(self.df.index.name or ''))
+        sheet.append(header)
+        for start, chunk in self.iter_chunks():
+            for row in chunk.itertuples(index=self.index, name=None):
+                sheet.append([None if pd.isna(value) else value for value in row])
+            self.progress.emit(start + len(chunk), total)
+        # Saving also closes the write-only stream; on cancel the temp file is dropped
+        workbook.save(self.temp_path)
+
+    def remove_temp_file(self):
+        if self.temp_path is not None and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
 
 class StockAnalysisApp(QMainWindow):
     def __init__(self):
@@ -25,6 +137,12 @@ class StockAnalysisApp(QMainWindow):
 
         # Load data
         self.load_data()
+        self.export_worker = None
+
+        # Directory of portfolio CSV files, polled for changes once selected
+        self.portfolio = None
+        self.portfolio_timer = QTimer(self)
+        self.portfolio_timer.timeout.connect(self.poll_portfolio)
 
         # Set up matplotlib figure and canvas with dark background
         self.figure = plt.figure(figsize=(12, 4))
@@ -39,7 +157,14 @@ class StockAnalysisApp(QMainWindow):
         self.deleteButton.clicked.connect(self.delete_data)
         self.sortButton.clicked.connect(self.sort_by_price)
         self.statsButton.clicked.connect(self.calculate_stats)
+        self.distributionButton.clicked.connect(self.show_distribution)
         self.chartButton.clicked.connect(self.generate_charts)
+        self.exportDataButton.clicked.connect(self.export_data)
+        self.exportStatsButton.clicked.connect(self.export_stats)
+        self.cancelExportButton.clicked.connect(self.cancel_export)
+        self.undoButton.clicked.connect(self.undo)
+        self.redoButton.clicked.connect(self.redo)
+        self.watchFolderButton.clicked.connect(self.watch_portfolio_folder)
 
         # Update table with initial data
         self.update_table()
@@ -174,6 +299,7 @@ class StockAnalysisApp(QMainWindow):
         self.deleteButton.setStyleSheet(f"background-color: {orange_accent}; color: black;")
         self.sortButton.setStyleSheet(f"background-color: {yellow_accent}; color: black;")
         self.statsButton.setStyleSheet(f"background-color: {yellow_accent}; color: black;")
+        self.distributionButton.setStyleSheet(f"background-color: {yellow_accent}; color: black;")
         self.chartButton.setStyleSheet(f"background-color: {accent_color}; color: white;")
 
         # Set alternating row colors for table
@@ -222,63 +348,234 @@ class StockAnalysisApp(QMainWindow):
                 'PE': [28.5, 32.1, 25.7, 40.2, 22.3, 60.5, 45.8, 12.3],
                 'Group': ['Tech', 'Tech', 'Tech', 'Retail', 'Tech', 'Auto', 'Tech', 'Finance']
             }
-            self.df = pd.DataFrame(data)
+            df = pd.DataFrame(data)
 
             # Add USD column (requirement 4)
-            self.df['USD'] = self.df['Price'] / 23
+            df['USD'] = df['Price'] / 23
 
             print("Data loaded successfully:")
-            print(self.df)  # Requirement 1: Print all data
+            print(df)  # Requirement 1: Print all data
         except Exception as e:
             print(f"Error loading data: {e}")
             # Create empty DataFrame with the same structure if loading fails
-            self.df = pd.DataFrame(columns=['Symbol', 'Price', 'PE', 'Group', 'USD'])
+            df = pd.DataFrame(columns=['Symbol', 'Price', 'PE', 'Group', 'USD'])
+
+        # Every edit goes through the store so it can be undone
+        self.store = VersionedFrame(df)
+
+        # Percentile/histogram/distinct-symbol sketches per Group
+        self.reset_sketches(df)
+
+    @property
+    def df(self):
+        # Current version of the data; read-only, edits go through self.store
+        return self.store.frame
 
     def update_table(self):
         # Update the table with current DataFrame data
-        self.tableWidget.setRowCount(len(self.df))
-        self.tableWidget.setColumnCount(len(self.df.columns))
-        self.tableWidget.setHorizontalHeaderLabels(self.df.columns)
+        df = self.df
+        self.tableWidget.setRowCount(len(df))
+        self.tableWidget.setColumnCount(len(df.columns))
+        self.tableWidget.setHorizontalHeaderLabels(df.columns)
+
+        # Remember which store row id is shown on each table row
+        self.table_row_ids = list(df.index)
 
         # Fill the table with data
-        for row in range(len(self.df)):
-            for col in range(len(self.df.columns)):
-                value = str(self.df.iloc[row, col])
-                item = QTableWidgetItem(value)
-
-                # Set text alignment
-                # Fix: Change Qt.AlignCenter to Qt.AlignmentFlag.AlignCenter
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-                # Color-code cells based on group
-                if col == 3:  # Group column
-                    group = self.df.iloc[row, col]
-                    if group == 'Tech':
-                        item.setBackground(QColor(0, 122, 204, 100))  # Blue with alpha
-                    elif group == 'Retail':
-                        item.setBackground(QColor(206, 145, 120, 100))  # Orange with alpha
-                    elif group == 'Auto':
-                        item.setBackground(QColor(106, 153, 85, 100))  # Green with alpha
-                    elif group == 'Finance':
-                        item.setBackground(QColor(197, 134, 192, 100))  # Purple with alpha
-
-                # Color-code price cells based on value
-                if col == 1:  # Price column
-                    price = self.df.iloc[row, col]
-                    if price > 300:
-                        item.setForeground(QColor(106, 153, 85))  # Green text for high prices
-                    elif price < 150:
-                        item.setForeground(QColor(206, 145, 120))  # Orange text for low prices
-
-                self.tableWidget.setItem(row, col, item)
+        for row in range(len(df)):
+            self.fill_table_row(row, df.iloc[row])
 
         # Resize columns to content
         self.tableWidget.resizeColumnsToContents()
 
         # Set row height
-        for row in range(len(self.df)):
+        for row in range(len(df)):
             self.tableWidget.setRowHeight(row, 30)
 
+        self.update_history_buttons()
+
+    def fill_table_row(self, row, values):
+        for col in range(len(values)):
+            value = str(values.iloc[col])
+            item = QTableWidgetItem(value)
+
+            # Set text alignment
+            # Fix: Change Qt.AlignCenter to Qt.AlignmentFlag.AlignCenter
+            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+
+            # Color-code cells based on group
+            if col == 3:  # Group column
+                group = values.iloc[col]
+                if group == 'Tech':
+                    item.setBackground(QColor(0, 122, 204, 100))  # Blue with alpha
+                elif group == 'Retail':
+                    item.setBackground(QColor(206, 145, 120, 100))  # Orange with alpha
+                elif group == 'Auto':
+                    item.setBackground(QColor(106, 153, 85, 100))  # Green with alpha
+                elif group == 'Finance':
+                    item.setBackground(QColor(197, 134, 192, 100))  # Purple with alpha
+
+            # Color-code price cells based on value
+            if col == 1:  # Price column
+                price = values.iloc[col]
+                if price > 300:
+                    item.setForeground(QColor(106, 153, 85))  # Green text for high prices
+                elif price < 150:
+                    item.setForeground(QColor(206, 145, 120))  # Orange text for low prices
+
+            self.tableWidget.setItem(row, col, item)
+
+    def refresh_table(self, changes):
+        # Only touch the rows in the change set; a reorder needs a full rebuild
+        if changes.reordered:
+            self.update_table()
+            return
+
+        if changes.removed:
+            removed = set(changes.removed)
+            for row in reversed(range(len(self.table_row_ids))):
+                if self.table_row_ids[row] in removed:
+                    self.tableWidget.removeRow(row)
+                    del self.table_row_ids[row]
+
+        # Insert in store order so undone deletes go back where they were
+        if changes.added:
+            added = self.store.rows(changes.added)
+            positions = self.store.positions(changes.added)
+            for row_id in sorted(changes.added, key=positions.get):
+                row = positions[row_id]
+                self.tableWidget.insertRow(row)
+                self.table_row_ids.insert(row, row_id)
+                self.fill_table_row(row, added.loc[row_id])
+                self.tableWidget.setRowHeight(row, 30)
+
+        if changes.modified:
+            modified = self.store.rows(changes.modified)
+            positions = {row_id: row for row, row_id in enumerate(self.table_row_ids)}
+            for row_id in changes.modified:
+                self.fill_table_row(positions[row_id], modified.loc[row_id])
+
+        self.update_history_buttons()
+
+    def apply_changes(self, changes):
+        self.refresh_table(changes)
+        self.update_sketches(changes)
+
+    def source_keys(self, df):
+        # Sketches are kept per Source file; rows without one (or without a
+        # portfolio at all) share the None partition
+        if 'Source' not in df.columns:
+            return [None] * len(df)
+        return [source if isinstance(source, str) else None for source in df['Source']]
+
+    def source_rows(self, source):
+        if 'Source' not in self.store.columns:
+            return self.df
+        return self.store.rows(self.store.find('Source', source))
+
+    def reset_sketches(self, df):
+        keys = self.source_keys(df)
+        # Store row ids start at 0 in frame order
+        self.row_sources = dict(enumerate(keys))
+        self.source_sketches = {}
+        for source in set(keys):
+            sketches = StockSketches()
+            sketches.update(df[[key == source for key in keys]])
+            self.source_sketches[source] = sketches
+        self.merge_sketches()
+
+    def merge_sketches(self):
+        # The stats view reads one merged sketch; merging costs only the sketch sizes
+        self.sketches = StockSketches()
+        for sketches in self.source_sketches.values():
+            self.sketches.merge(sketches)
+
+    def update_sketches(self, changes):
+        # Sketches only grow, so new rows are folded into their source's sketch,
+        # while a source that lost or changed rows is rebuilt from its own rows only
+        rebuild = {self.row_sources.pop(row_id) for row_id in changes.removed}
+        changed = self.store.rows(changes.added + changes.modified)
+        sources = self.source_keys(changed)
+        self.row_sources.update(zip(changed.index, sources))
+        added_sources = sources[:len(changes.added)]
+        rebuild.update(sources[len(changes.added):])
+
+        added = changed.iloc[:len(changes.added)]
+        for source in set(added_sources) - rebuild:
+            rows = added[[key == source for key in added_sources]]
+            self.source_sketches.setdefault(source, StockSketches()).update(rows)
+
+        for source in rebuild:
+            rows = self.source_rows(source)
+            if len(rows):
+                self.source_sketches[source] = StockSketches()
+                self.source_sketches[source].update(rows)
+            else:
+                self.source_sketches.pop(source, None)
+
+        if changes.added or rebuild:
+            self.merge_sketches()
+
+    def watch_portfolio_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, "Watch Portfolio Folder")
+        if not directory:
+            return
+
+        self.portfolio = PortfolioSource(directory)
+        df = self.portfolio.load_all()
+
+        # A new data set starts a fresh history
+        self.store = VersionedFrame(df)
+        self.reset_sketches(df)
+        self.update_table()
+        self.generate_charts()
+
+        self.portfolio_timer.start(2000)
+        message = f"Watching {directory}: {len(self.portfolio.signatures)} files, {len(df)} rows"
+        if self.portfolio.failed:
+            message += f"; could not read {self.describe_failures(self.portfolio.failed)}"
+        self.statusbar.showMessage(message, 10000)
+
+    def describe_failures(self, errors):
+        return '; '.join(f"{source} ({error})" for source, error in sorted(errors.items()))
+
+    def poll_portfolio(self):
+        # Only files whose mtime/size changed are re-parsed; their rows are swapped in place.
+        # Reloads mirror the files on disk, so they reset the undo history instead of joining it.
+        changed, removed, errors = self.portfolio.poll()
+        # Parse errors are reported once; a failing file is not read again until it changes
+        failures = f"Could not read {self.describe_failures(errors)}" if errors else ""
+        if not changed and not removed:
+            if failures:
+                self.statusbar.showMessage(failures, 10000)
+            return
+
+        for source in removed:
+            self.apply_changes(self.store.delete(self.store.find('Source', source), baseline=True))
+        for source, df in changed.items():
+            ids = self.store.find('Source', source)
+            self.apply_changes(self.store.replace(ids, df, key='Symbol', baseline=True))
+
+        self.generate_charts()
+        message = f"Reloaded {', '.join(sorted(changed) + sorted(removed))}"
+        if failures:
+            message += f"; {failures}"
+        self.statusbar.showMessage(message, 10000 if failures else 5000)
+
+    def update_history_buttons(self):
+        self.undoButton.setEnabled(self.store.can_undo)
+        self.redoButton.setEnabled(self.store.can_redo)
+
+    def undo(self):
+        changes = self.store.undo()
+        if changes is not None:
+            self.apply_changes(changes)
+
+    def redo(self):
+        changes = self.store.redo()
+        if changes is not None:
+            self.apply_changes(changes)
+
     def search_and_modify(self):
         # Requirement 3: Search by Symbol and reduce Price by 1/2
         symbol = self.symbolInput.text().strip()
@@ -286,11 +583,13 @@ class StockAnalysisApp(QMainWindow):
             QMessageBox.warning(self, "Input Error", "Please enter a symbol to search.")
             return
 
-        if symbol in self.df['Symbol'].values:
-            self.df.loc[self.df['Symbol'] == symbol, 'Price'] /= 2
+        ids = self.store.find('Symbol', symbol)
+        if len(ids):
+            rows = self.store.rows(ids)
+            rows['Price'] = rows['Price'] / 2
             # Update USD column after price change
-            self.df['USD'] = self.df['Price'] / 23
-            self.update_table()
+            rows['USD'] = rows['Price'] / 23
+            self.apply_changes(self.store.update(rows[['Price', 'USD']]))
             QMessageBox.information(self, "Success", f"Price for {symbol} reduced by half.")
         else:
             QMessageBox.warning(self, "Not Found", f"Symbol {symbol} not found in the data.")
@@ -319,8 +618,7 @@ class StockAnalysisApp(QMainWindow):
                 'USD': [usd]
             })
 
-            self.df = pd.concat([self.df, new_row], ignore_index=True)
-            self.update_table()
+            self.apply_changes(self.store.append(new_row))
 
             # Clear input fields
             self.newSymbol.clear()
@@ -339,36 +637,38 @@ class StockAnalysisApp(QMainWindow):
             QMessageBox.warning(self, "Input Error", "Please enter a symbol to delete.")
             return
 
-        initial_len = len(self.df)
-        self.df = self.df[self.df['Symbol'] != symbol]
+        ids = self.store.find('Symbol', symbol)
 
-        if len(self.df) < initial_len:
-            self.update_table()
+        if len(ids):
+            self.apply_changes(self.store.delete(ids))
             QMessageBox.information(self, "Success", f"Rows with Symbol {symbol} deleted.")
         else:
             QMessageBox.warning(self, "Not Found", f"Symbol {symbol} not found in the data.")
 
     def sort_by_price(self):
         # Requirement 2: Sort by Price ascending
-        self.df = self.df.sort_values(by='Price')
-        self.update_table()
+        self.apply_changes(self.store.sort_by('Price'))
         QMessageBox.information(self, "Success", "Data sorted by Price (ascending).")
 
+    def compute_group_stats(self, stat_func):
+        if stat_func == "mean":
+            return self.df.groupby('Group').mean()
+        elif stat_func == "sum":
+            return self.df.groupby('Group').sum()
+        elif stat_func == "count":
+            return self.df.groupby('Group').count()
+        elif stat_func == "min":
+            return self.df.groupby('Group').min()
+        elif stat_func == "max":
+            return self.df.groupby('Group').max()
+        raise ValueError(f"Unknown statistics function: {stat_func}")
+
     def calculate_stats(self):
         # Requirement 6: Group by Group column and calculate statistics
         stat_func = self.statsCombo.currentText()
 
         try:
-            if stat_func == "mean":
-                result = self.df.groupby('Group').mean()
-            elif stat_func == "sum":
-                result = self.df.groupby('Group').sum()
-            elif stat_func == "count":
-                result = self.df.groupby('Group').count()
-            elif stat_func == "min":
-                result = self.df.groupby('Group').min()
-            elif stat_func == "max":
-                result = self.df.groupby('Group').max()
+            result = self.compute_group_stats(stat_func)
 
             # Display results in a message box
             QMessageBox.information(self, f"Group {stat_func.capitalize()}",
@@ -376,6 +676,86 @@ class StockAnalysisApp(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error calculating statistics: {e}")
 
+    def show_distribution(self):
+        # Percentiles come from the sketches, so no sort of the full data is needed
+        try:
+            result = self.sketches.summary()
+            text = result.round(2).to_string()
+            QMessageBox.information(self, "Group Percentiles",
+                                    f"Percentiles by Group (±{self.sketches.epsilon:.0%} rank error):\n\n{text}")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error calculating percentiles: {e}")
+
+    def export_data(self):
+        self.start_export(self.df, "stock_data.csv")
+
+    def export_stats(self):
+        stat_func = self.statsCombo.currentText()
+        try:
+            result = self.compute_group_stats(stat_func)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Error calculating statistics: {e}")
+            return
+        # Keep the Group labels, which live in the index after groupby
+        self.start_export(result, f"group_{stat_func}.csv", index=True)
+
+    def start_export(self, df, default_name, index=False):
+        if self.export_worker is not None and self.export_worker.isRunning():
+            QMessageBox.warning(self, "Export Running", "An export is already in progress.")
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export", default_name,
+            "CSV (*.csv);;Parquet (*.parquet);;Excel (*.xlsx)")
+        if not path:
+            return
+
+        self.export_worker = ExportWorker(df, path, index=index, parent=self)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.completed.connect(self.on_export_completed)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.cancelled.connect(self.on_export_cancelled)
+
+        self.exportDataButton.setEnabled(False)
+        self.exportStatsButton.setEnabled(False)
+        self.cancelExportButton.setEnabled(True)
+        self.statusbar.showMessage(f"Exporting {len(df)} rows...")
+        self.export_worker.start()
+
+    def cancel_export(self):
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.statusbar.showMessage("Cancelling export...")
+
+    def on_export_progress(self, written, total):
+        percent = written * 100 // total if total else 100
+        self.statusbar.showMessage(f"Exported {written}/{total} rows ({percent}%)")
+
+    def on_export_completed(self, path):
+        self.finish_export()
+        self.statusbar.showMessage(f"Exported to {path}", 5000)
+
+    def on_export_failed(self, message):
+        self.finish_export()
+        self.statusbar.clearMessage()
+        QMessageBox.warning(self, "Export Error", f"Error exporting data: {message}")
+
+    def on_export_cancelled(self):
+        self.finish_export()
+        self.statusbar.showMessage("Export cancelled", 5000)
+
+    def finish_export(self):
+        self.exportDataButton.setEnabled(True)
+        self.exportStatsButton.setEnabled(True)
+        self.cancelExportButton.setEnabled(False)
+
+    def closeEvent(self, event):
+        # A running QThread must finish before the window that owns it is destroyed
+        if self.export_worker is not None and self.export_worker.isRunning():
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        super().closeEvent(event)
+
     def generate_charts(self):
         # Clear previous charts
         self.figure.clear()
@@ -0,0 +1,240 @@
+import hashlib
+import math
+import random
+
+import numpy as np
+import pandas as pd
+
+SKETCH_COLUMNS = ['Price', 'PE', 'USD']
+
+# Fixed histogram ranges; values outside land in the underflow/overflow counters
+HISTOGRAM_RANGES = {
+    'Price': (0.0, 500.0),
+    'PE': (0.0, 100.0),
+    'USD': (0.0, 25.0),
+}
+HISTOGRAM_BINS = 20
+
+
+class KLLSketch:
+    # Mergeable quantile sketch (Karnin, Lang, Liberty 2016).
+    # epsilon is the target normalized rank error; memory depends only on epsilon.
+    def __init__(self, epsilon=0.01, seed=None):
+        self.epsilon = epsilon
+        # Empirical k/epsilon relation used by Apache DataSketches for KLL
+        self.k = max(8, int(math.ceil((2.446 / epsilon) ** (1 / 0.9433))))
+        self.compactors = []
+        self.size = 0
+        self.max_size = 0
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._random = random.Random(seed)
+        self._grow()
+
+    def _capacity(self, level):
+        height = len(self.compactors)
+        return int(math.ceil(self.k * (2 / 3) ** (height - level - 1))) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        while self.size >= self.max_size:
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self._grow()
+                    items.sort()
+                    # Keep the odd item out at this level, promote every other item
+                    keep = [items.pop()] if len(items) % 2 else []
+                    offset = self._random.randint(0, 1)
+                    self.compactors[level + 1].extend(items[offset::2])
+                    self.compactors[level] = keep
+                    break
+            self.size = sum(len(items) for items in self.compactors)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.compactors[0].extend(values.tolist())
+        self.size += len(values)
+        self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.size = sum(len(items) for items in self.compactors)
+        self._compress()
+
+    def quantiles(self, qs):
+        if self.n == 0:
+            return [math.nan for _ in qs]
+        items = []
+        weights = []
+        for level, level_items in enumerate(self.compactors):
+            items.extend(level_items)
+            weights.extend([2 ** level] * len(level_items))
+        order = np.argsort(items, kind='stable')
+        items = np.asarray(items)[order]
+        cumulative = np.cumsum(np.asarray(weights)[order])
+        total = cumulative[-1]
+
+        result = []
+        for q in qs:
+            if q <= 0:
+                result.append(self.min)
+            elif q >= 1:
+                result.append(self.max)
+            else:
+                position = min(np.searchsorted(cumulative, q * total), len(items) - 1)
+                result.append(float(items[position]))
+        return result
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+
+class FixedHistogram:
+    # Equal-width bins over a fixed range, so two histograms merge by adding counts
+    def __init__(self, low, high, bins=HISTOGRAM_BINS):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.underflow += int((values < self.edges[0]).sum())
+        self.overflow += int((values > self.edges[-1]).sum())
+        counts, _ = np.histogram(values, bins=self.edges)
+        self.counts += counts
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+
+class HyperLogLog:
+    # Distinct count estimate with relative error about 1.04 / sqrt(2 ** precision)
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        for value in values:
+            digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+            hashed = int.from_bytes(digest, 'big')
+            index = hashed >> (64 - self.precision)
+            rest = hashed & ((1 << (64 - self.precision)) - 1)
+            rank = (64 - self.precision) - rest.bit_length() + 1
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = int((self.registers == 0).sum())
+        # Linear counting is more accurate while many registers are still empty
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class GroupSketches:
+    # Quantile and histogram sketches per numeric column plus distinct symbols
+    def __init__(self, epsilon=0.01, precision=12, seed=None):
+        self.quantile_sketches = {column: KLLSketch(epsilon, seed) for column in SKETCH_COLUMNS}
+        self.histograms = {column: FixedHistogram(*HISTOGRAM_RANGES[column]) for column in SKETCH_COLUMNS}
+        self.symbols = HyperLogLog(precision)
+
+    def update(self, df):
+        for column in SKETCH_COLUMNS:
+            if column in df.columns:
+                self.quantile_sketches[column].update(df[column])
+                self.histograms[column].update(df[column])
+        self.symbols.update(df['Symbol'])
+
+    def merge(self, other):
+        for column in SKETCH_COLUMNS:
+            self.quantile_sketches[column].merge(other.quantile_sketches[column])
+            self.histograms[column].merge(other.histograms[column])
+        self.symbols.merge(other.symbols)
+
+
+class StockSketches:
+    # Per-Group sketches that update as rows arrive and merge across file chunks
+    def __init__(self, epsilon=0.01, precision=12, seed=None):
+        self.epsilon = epsilon
+        self.precision = precision
+        self.seed = seed
+        self.groups = {}
+
+    def _group(self, group):
+        if group not in self.groups:
+            self.groups[group] = GroupSketches(self.epsilon, self.precision, self.seed)
+        return self.groups[group]
+
+    def update(self, df):
+        for group, rows in df.groupby('Group', sort=False):
+            self._group(group).update(rows)
+
+    def merge(self, other):
+        for group, sketches in other.groups.items():
+            self._group(group).merge(sketches)
+
+    @classmethod
+    def from_csv(cls, path, chunksize=100000, **kwargs):
+        # Sketch each chunk separately and merge, so the file is never fully loaded
+        sketches = cls(**kwargs)
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            if 'USD' not in chunk.columns:
+                chunk['USD'] = chunk['Price'] / 23
+            chunk_sketches = cls(**kwargs)
+            chunk_sketches.update(chunk)
+            sketches.merge(chunk_sketches)
+        return sketches
+
+    def quantiles(self, group, column, qs=(0.5, 0.9, 0.99)):
+        return self.groups[group].quantile_sketches[column].quantiles(qs)
+
+    def histogram(self, group, column):
+        histogram = self.groups[group].histograms[column]
+        return histogram.counts.copy(), histogram.edges.copy()
+
+    def distinct_symbols(self, group):
+        return self.groups[group].symbols.count()
+
+    def summary(self, qs=(0.5, 0.9, 0.99)):
+        rows = {}
+        for group, sketches in sorted(self.groups.items()):
+            row = {'Symbols': sketches.symbols.count()}
+            for column in SKETCH_COLUMNS:
+                values = sketches.quantile_sketches[column].quantiles(qs)
+                for q, value in zip(qs, values):
+                    row[f'{column} p{q * 100:g}'] = value
+            rows[group] = row
+        summary = pd.DataFrame.from_dict(rows, orient='index')
+        summary.index.name = 'Group'
+        return summary
@@ -0,0 +1,276 @@
+import numpy as np
+import pandas as pd
+
+# Number of rows per column chunk; a mutation copies only the chunks it touches
+CHUNK_ROWS = 1024
+
+# Number of edits kept for undo; older versions are dropped with their chunks
+MAX_HISTORY = 50
+
+
+class ChangeSet:
+    # Row ids touched by one mutation, used by views to refresh only those rows
+    def __init__(self, added=(), removed=(), modified=(), reordered=False):
+        self.added = tuple(added)
+        self.removed = tuple(removed)
+        self.modified = tuple(modified)
+        self.reordered = reordered
+
+    def inverted(self):
+        # The change set that undoes this one
+        return ChangeSet(self.removed, self.added, self.modified, self.reordered)
+
+    def is_empty(self):
+        return not (self.added or self.removed or self.modified or self.reordered)
+
+    def __repr__(self):
+        return (f"ChangeSet(added={len(self.added)}, removed={len(self.removed)}, "
+                f"modified={len(self.modified)}, reordered={self.reordered})")
+
+
+class ColumnChunk:
+    # Immutable block of rows; versions share every chunk they do not change
+    def __init__(self, ids, columns):
+        self.ids = ids
+        self.columns = columns
+        self.ids.flags.writeable = False
+        for values in self.columns.values():
+            values.flags.writeable = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def take(self, mask):
+        return ColumnChunk(self.ids[mask], {name: values[mask] for name, values in self.columns.items()})
+
+    def with_values(self, mask, updates):
+        columns = dict(self.columns)
+        for name, new_values in updates.items():
+            new_values = np.asarray(new_values)
+            values = columns[name].astype(np.result_type(columns[name], new_values))
+            values[mask] = new_values
+            columns[name] = values
+        return ColumnChunk(self.ids, columns)
+
+    def extended(self, ids, columns):
+        return ColumnChunk(np.concatenate([self.ids, ids]),
+                           {name: np.concatenate([values, columns[name]])
+                            for name, values in self.columns.items()})
+
+
+class VersionedFrame:
+    # Copy-on-write store of a DataFrame with undo/redo history.
+    # Every row gets a stable id that never changes, so a ChangeSet stays valid
+    # across versions and the materialized frame is indexed by those ids.
+    def __init__(self, df, chunk_rows=CHUNK_ROWS, max_history=MAX_HISTORY):
+        self.columns = list(df.columns)
+        self.chunk_rows = chunk_rows
+        self.max_history = max_history
+        self._next_id = len(df)
+        chunks = self._build_chunks(np.arange(len(df), dtype=np.int64), df)
+        self._versions = [(chunks, ChangeSet())]
+        self._current = 0
+        self._frame_cache = None
+
+    @property
+    def version(self):
+        return self._current
+
+    @property
+    def can_undo(self):
+        return self._current > 0
+
+    @property
+    def can_redo(self):
+        return self._current < len(self._versions) - 1
+
+    @property
+    def chunks(self):
+        return self._versions[self._current][0]
+
+    @property
+    def frame(self):
+        # Full copy of the current version for consumers that need every row
+        # (charts, export, groupby). Built lazily, cached per version, read-only.
+        chunks = self.chunks
+        if self._frame_cache is None or self._frame_cache[0] is not chunks:
+            self._frame_cache = (chunks, self._materialize(chunks))
+        return self._frame_cache[1]
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def find(self, column, value):
+        # Vectorized scan, nothing is copied; None matches missing values
+        if value is None:
+            matches = [chunk.ids[pd.isna(chunk.columns[column])] for chunk in self.chunks]
+        else:
+            matches = [chunk.ids[chunk.columns[column] == value] for chunk in self.chunks]
+        return np.concatenate(matches) if matches else np.array([], dtype=np.int64)
+
+    def rows(self, ids):
+        # Gathered straight from the chunks holding ids; only those rows are copied
+        ids = np.asarray(ids, dtype=np.int64)
+        found_ids = []
+        found = {name: [] for name in self.columns}
+        for chunk in self.chunks:
+            mask = np.isin(chunk.ids, ids)
+            if not mask.any():
+                continue
+            found_ids.append(chunk.ids[mask])
+            for name in self.columns:
+                found[name].append(chunk.columns[name][mask])
+        if not found_ids:
+            return pd.DataFrame(columns=self.columns)
+        data = {name: np.concatenate(values) for name, values in found.items()}
+        df = pd.DataFrame(data, index=np.concatenate(found_ids), columns=self.columns)
+        return df.loc[ids]
+
+    def positions(self, ids):
+        # Row position of each id in the current order, without building the frame
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = {}
+        offset = 0
+        for chunk in self.chunks:
+            for index in np.flatnonzero(np.isin(chunk.ids, ids)):
+                positions[int(chunk.ids[index])] = offset + int(index)
+            offset += len(chunk)
+        return positions
+
+    def append(self, df):
+        chunks, added = self._appended(self.chunks, df)
+        return self._commit(chunks, ChangeSet(added=added))
+
+    def delete(self, ids, baseline=False):
+        chunks, removed = self._deleted(self.chunks, ids)
+        return self._commit(chunks, ChangeSet(removed=removed), baseline)
+
+    def update(self, values):
+        # values is a DataFrame indexed by row id holding the new column values
+        chunks, modified = self._updated(self.chunks, values)
+        return self._commit(chunks, ChangeSet(modified=modified))
+
+    def replace(self, ids, df, key, baseline=False):
+        # Swap the rows in ids for the rows of df as a single version.
+        # Rows are paired by key (and occurrence, for repeated keys) so a row that
+        # survives keeps its id and position and only real differences are reported.
+        df = df[self.columns].reset_index(drop=True)
+        old = self.rows(ids)
+        old_keys = pd.MultiIndex.from_arrays([old[key], old.groupby(key).cumcount()])
+        new_keys = pd.MultiIndex.from_arrays([df[key], df.groupby(key).cumcount()])
+        positions = new_keys.get_indexer(old_keys)
+
+        kept = positions >= 0
+        removed_ids = old.index[~kept]
+        new_rows = df.drop(index=positions[kept])
+
+        values = df.iloc[positions[kept]].set_axis(old.index[kept])
+        differs = ~(values.eq(old[kept]) | (values.isna() & old[kept].isna())).all(axis=1)
+        values = values[differs]
+
+        chunks, modified = self._updated(self.chunks, values)
+        chunks, removed = self._deleted(chunks, removed_ids)
+        chunks, added = self._appended(chunks, new_rows)
+        return self._commit(chunks, ChangeSet(added=added, removed=removed, modified=modified), baseline)
+
+    def sort_by(self, column, ascending=True):
+        # A reorder touches every row, so all chunks are rebuilt
+        frame = self.frame.sort_values(by=column, ascending=ascending, kind='stable')
+        chunks = self._build_chunks(frame.index.to_numpy(dtype=np.int64), frame)
+        return self._commit(chunks, ChangeSet(reordered=True))
+
+    def undo(self):
+        if not self.can_undo:
+            return None
+        changes = self._versions[self._current][1].inverted()
+        self._current -= 1
+        return changes
+
+    def redo(self):
+        if not self.can_redo:
+            return None
+        self._current += 1
+        return self._versions[self._current][1]
+
+    def _commit(self, chunks, changes, baseline=False):
+        if changes.is_empty():
+            return changes
+        if baseline:
+            # Changes from outside (e.g. a file reload) become the new starting
+            # point; undo never steps back into data that no longer matches disk
+            self._versions = [(chunks, ChangeSet())]
+            self._current = 0
+            return changes
+        # A new edit after undo discards the redo branch
+        del self._versions[self._current + 1:]
+        self._versions.append((chunks, changes))
+        self._current += 1
+        # Drop the oldest versions so at most max_history edits can be undone
+        excess = len(self._versions) - 1 - self.max_history
+        if excess > 0:
+            del self._versions[:excess]
+            self._current -= excess
+        return changes
+
+    def _appended(self, chunks, df):
+        # Columns the new rows lack (e.g. Source for a hand-added row) become NaN
+        df = df.reindex(columns=self.columns)
+        ids = np.arange(self._next_id, self._next_id + len(df), dtype=np.int64)
+        self._next_id += len(df)
+        chunks = list(chunks)
+
+        # Top up the last chunk before starting new ones
+        start = 0
+        if chunks and len(chunks[-1]) < self.chunk_rows:
+            start = min(self.chunk_rows - len(chunks[-1]), len(df))
+            chunks[-1] = chunks[-1].extended(ids[:start], self._column_arrays(df.iloc[:start]))
+        chunks.extend(self._build_chunks(ids[start:], df.iloc[start:]))
+
+        return tuple(chunks), ids.tolist()
+
+    def _deleted(self, chunks, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        kept = []
+        removed = []
+        for chunk in chunks:
+            mask = np.isin(chunk.ids, ids)
+            if not mask.any():
+                kept.append(chunk)
+                continue
+            removed.extend(chunk.ids[mask].tolist())
+            if not mask.all():
+                kept.append(chunk.take(~mask))
+
+        return tuple(kept), removed
+
+    def _updated(self, chunks, values):
+        updated = []
+        modified = []
+        for chunk in chunks:
+            mask = np.isin(chunk.ids, values.index)
+            if not mask.any():
+                updated.append(chunk)
+                continue
+            chunk_ids = chunk.ids[mask]
+            modified.extend(chunk_ids.tolist())
+            updates = {name: values.loc[chunk_ids, name].to_numpy() for name in values.columns}
+            updated.append(chunk.with_values(mask, updates))
+
+        return tuple(updated), modified
+
+    def _column_arrays(self, df):
+        return {name: df[name].to_numpy(copy=True) for name in self.columns}
+
+    def _build_chunks(self, ids, df):
+        chunks = []
+        for start in range(0, len(df), self.chunk_rows):
+            part = df.iloc[start:start + self.chunk_rows]
+            chunks.append(ColumnChunk(ids[start:start + self.chunk_rows].copy(), self._column_arrays(part)))
+        return tuple(chunks)
+
+    def _materialize(self, chunks):
+        if not chunks:
+            return pd.DataFrame(columns=self.columns)
+        data = {name: np.concatenate([chunk.columns[name] for chunk in chunks]) for name in self.columns}
+        index = np.concatenate([chunk.ids for chunk in chunks])
+        return pd.DataFrame(data, index=index, columns=self.columns)
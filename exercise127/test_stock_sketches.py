@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_sketches import (FixedHistogram, HyperLogLog, KLLSketch, StockSketches,
+                            HISTOGRAM_RANGES, HISTOGRAM_BINS)
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def assert_rank_error_within(estimates, values, epsilon):
+    # An estimate for q is within epsilon rank error when it lies between the
+    # exact (q - epsilon) and (q + epsilon) quantiles of the data
+    for q, estimate in zip(QUANTILES, estimates):
+        low = np.quantile(values, max(q - epsilon, 0.0), method='inverted_cdf')
+        high = np.quantile(values, min(q + epsilon, 1.0), method='inverted_cdf')
+        assert low <= estimate <= high, f"q={q:.2f}: {estimate} not in [{low}, {high}]"
+
+
+@pytest.mark.parametrize("epsilon", [0.05, 0.02, 0.01])
+def test_kll_merged_chunks_within_epsilon(epsilon):
+    rng = np.random.default_rng(7)
+    values = rng.lognormal(3, 1, 200000)
+
+    sketch = KLLSketch(epsilon, seed=1)
+    for seed, chunk in enumerate(np.array_split(values, 9)):
+        chunk_sketch = KLLSketch(epsilon, seed=seed + 2)
+        chunk_sketch.update(chunk)
+        sketch.merge(chunk_sketch)
+
+    assert sketch.n == len(values)
+    assert sketch.quantile(0) == values.min()
+    assert sketch.quantile(1) == values.max()
+    assert_rank_error_within(sketch.quantiles(QUANTILES), values, epsilon)
+
+
+def test_kll_memory_does_not_grow_with_rows():
+    rng = np.random.default_rng(8)
+    sketch = KLLSketch(0.02, seed=1)
+    for _ in range(20):
+        sketch.update(rng.normal(size=20000))
+        # Level capacities shrink by 2/3, so retained items stay below about 3k
+        assert sketch.size <= 3 * sketch.k + 2 * len(sketch.compactors)
+
+
+def test_fixed_histogram_matches_numpy():
+    rng = np.random.default_rng(9)
+    values = rng.normal(50, 40, 50000)
+    values[:10] = np.nan
+
+    first = FixedHistogram(0.0, 100.0, 25)
+    second = FixedHistogram(0.0, 100.0, 25)
+    first.update(values[:20000])
+    second.update(values[20000:])
+    first.merge(second)
+
+    clean = values[~np.isnan(values)]
+    expected, _ = np.histogram(clean, bins=first.edges)
+    assert np.array_equal(first.counts, expected)
+    assert first.underflow == int((clean < 0).sum())
+    assert first.overflow == int((clean > 100).sum())
+
+
+@pytest.mark.parametrize("precision", [10, 12])
+def test_hyperloglog_within_error(precision):
+    rng = np.random.default_rng(10)
+    symbols = [f"SYM{i}" for i in rng.integers(0, 30000, 60000)]
+    exact = len(set(symbols))
+
+    sketch = HyperLogLog(precision)
+    other = HyperLogLog(precision)
+    sketch.update(symbols[:35000])
+    other.update(symbols[25000:])
+    sketch.merge(other)
+
+    # Three standard errors
+    bound = 3 * 1.04 / math.sqrt(sketch.m)
+    assert abs(sketch.count() - exact) / exact <= bound
+
+
+def test_hyperloglog_small_counts_are_exact():
+    sketch = HyperLogLog()
+    sketch.update(['VNM', 'REE', 'DHG', 'FPT', 'AGF', 'VNM'])
+    assert sketch.count() == 5
+
+
+@pytest.mark.parametrize("epsilon", [0.05, 0.01])
+def test_stock_sketches_from_csv_match_exact(tmp_path, epsilon):
+    rng = np.random.default_rng(11)
+    row_count = 60000
+    df = pd.DataFrame({
+        'Symbol': [f"S{i}" for i in rng.integers(0, 5000, row_count)],
+        'Price': rng.lognormal(4, 0.8, row_count),
+        'PE': rng.gamma(4, 4, row_count),
+        'Group': rng.choice(['high', 'low'], row_count),
+    })
+    path = tmp_path / "portfolio.csv"
+    df.to_csv(path, index=False)
+    df = pd.read_csv(path)
+    df['USD'] = df['Price'] / 23
+
+    sketches = StockSketches.from_csv(path, chunksize=7000, epsilon=epsilon, seed=3)
+
+    for group, group_rows in df.groupby('Group'):
+        for column in ['Price', 'PE', 'USD']:
+            estimates = sketches.quantiles(group, column, QUANTILES)
+            assert_rank_error_within(estimates, group_rows[column].to_numpy(), epsilon)
+
+            counts, edges = sketches.histogram(group, column)
+            expected, _ = np.histogram(group_rows[column], bins=edges)
+            assert np.array_equal(counts, expected)
+            assert len(counts) == HISTOGRAM_BINS
+            assert edges[0] == HISTOGRAM_RANGES[column][0]
+
+        exact = group_rows['Symbol'].nunique()
+        bound = 3 * 1.04 / math.sqrt(2 ** sketches.precision)
+        assert abs(sketches.distinct_symbols(group) - exact) / exact <= bound
+
+    summary = sketches.summary()
+    assert list(summary.index) == ['high', 'low']
+    assert {'Price p50', 'PE p90', 'USD p99', 'Symbols'} <= set(summary.columns)